@@ -1,5 +1,6 @@
-from fastapi import FastAPI, Depends, HTTPException, status, APIRouter
+from fastapi import FastAPI, Depends, HTTPException, status, APIRouter, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -12,9 +13,15 @@ import json
 from pathlib import Path
 from urllib.parse import quote_plus
 import pymongo
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import SecondaryPreferred
 from dotenv import load_dotenv
 from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
 from random import choice
+import asyncio
+import time
+from seat_feed import SeatFeed
 
 # Setup logging and MongoDB connection
 logger = logging.getLogger('uvicorn.error')
@@ -22,10 +29,20 @@ load_dotenv()
 
 proj_name = os.getenv("MONGODB_APP_NAME") if os.getenv("MONGODB_APP_NAME") is not None else "COE892Project"
 logger.info(f"Project name: {proj_name}")
-conString = f"mongodb+srv://" \
-            f'{quote_plus(os.getenv("MONGODB_USER"))}:{quote_plus(os.getenv("MONGODB_PASSWORD"))}' \
-            f'@{os.getenv("MONGODB_CLUSTER_URL")}/?retryWrites=true&w=majority' \
-            f'&appName={proj_name}'
+# MONGODB_URI overrides the Atlas connection, e.g. to test against a local replica set
+conString = os.getenv("MONGODB_URI")
+if conString is None:
+    conString = f"mongodb+srv://" \
+                f'{quote_plus(os.getenv("MONGODB_USER"))}:{quote_plus(os.getenv("MONGODB_PASSWORD"))}' \
+                f'@{os.getenv("MONGODB_CLUSTER_URL")}/?retryWrites=true&w=majority' \
+                f'&appName={proj_name}'
+
+# Read routing: writes, auth and read-your-writes paths use the primary (db). Reference
+# data and reports may be served by secondaries no staler than the configured bound;
+# if none qualifies the primary is used.
+MIN_MAX_STALENESS_SECONDS = 90
+REFERENCE_MAX_STALENESS_SECONDS = int(os.getenv("MONGODB_REFERENCE_MAX_STALENESS_SECONDS", "120"))
+REPORT_MAX_STALENESS_SECONDS = int(os.getenv("MONGODB_REPORT_MAX_STALENESS_SECONDS", "90"))
 
 client = pymongo.MongoClient(conString)
 try:
@@ -35,8 +52,74 @@ except Exception as e:
     logger.error(e)
     exit(1)
 
+# pymongo only rejects a too-small max staleness when selecting a server, so check it here
+for setting, value in [("MONGODB_REFERENCE_MAX_STALENESS_SECONDS", REFERENCE_MAX_STALENESS_SECONDS),
+                       ("MONGODB_REPORT_MAX_STALENESS_SECONDS", REPORT_MAX_STALENESS_SECONDS)]:
+    if value < MIN_MAX_STALENESS_SECONDS:
+        logger.error(f"{setting} must be at least {MIN_MAX_STALENESS_SECONDS} seconds, got {value}")
+        exit(1)
+
+
 db = client.CourseEnrollment
-app = FastAPI()
+reference_db = client.get_database(
+    "CourseEnrollment",
+    read_preference=SecondaryPreferred(max_staleness=REFERENCE_MAX_STALENESS_SECONDS)
+)
+report_db = client.get_database(
+    "CourseEnrollment",
+    read_preference=SecondaryPreferred(max_staleness=REPORT_MAX_STALENESS_SECONDS),
+    read_concern=ReadConcern("majority")
+)
+
+# Username -> (cluster time, operation time, monotonic time) of the user's last
+# enrollment/intention write. For one report max-staleness window after a write their
+# report reads go to the primary in a causally consistent session; after that any eligible
+# secondary already has the write, so the entry is dropped. This is process memory, which
+# matches the single-instance deployment (see SeatFeed): a restart or a second instance
+# simply sends those reads to secondaries again.
+last_writes = {}
+
+def record_write(current_user, session):
+    if session.operation_time is None:
+        return
+    now = time.monotonic()
+    for username, last_write in list(last_writes.items()):
+        if now - last_write[2] > REPORT_MAX_STALENESS_SECONDS:
+            del last_writes[username]
+    last_writes[current_user["username"]] = (session.cluster_time, session.operation_time, now)
+
+@contextmanager
+def causal_write(current_user):
+    with client.start_session(causal_consistency=True) as session:
+        yield session
+        record_write(current_user, session)
+
+@contextmanager
+def causal_read(current_user):
+    """Yield (database, session) for a user's report reads: the primary with a session
+    advanced to their recent write, otherwise secondaries without a session."""
+    last_write = last_writes.get(current_user["username"])
+    if last_write is None or time.monotonic() - last_write[2] > REPORT_MAX_STALENESS_SECONDS:
+        yield report_db, None
+        return
+    with client.start_session(causal_consistency=True) as session:
+        session.advance_cluster_time(last_write[0])
+        session.advance_operation_time(last_write[1])
+        yield db, session
+
+# Live seat feed configuration
+SEAT_FEED_TICK_SECONDS = float(os.getenv("SEAT_FEED_TICK_SECONDS", "1"))
+SEAT_FEED_KEEPALIVE_SECONDS = 15
+
+seat_feed = SeatFeed(db, SEAT_FEED_TICK_SECONDS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = asyncio.create_task(seat_feed.run())
+    yield
+    task.cancel()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
@@ -244,7 +327,7 @@ async def delete_account(username: str, current_user: Annotated[Accounts, Depend
 # Courses endpoints
 @app.get("/courses/", response_model=List[Course])
 async def get_courses(current_user: Annotated[Accounts, Depends(get_current_user)]):
-    return list(db.courses.find())
+    return list(reference_db.courses.find())
 
 @app.post("/courses/", response_model=Course)
 async def create_course(course: Course, current_user: Annotated[Accounts, Depends(get_current_user)]):
@@ -264,7 +347,7 @@ async def delete_course(course_code: str, current_user: Annotated[Accounts, Depe
 # Students endpoints
 @app.get("/students/", response_model=List[Student])
 async def get_students(current_user: Annotated[Accounts, Depends(get_current_user)]):
-    return list(db.students.find())
+    return list(reference_db.students.find())
 
 @app.post("/students/", response_model=Student)
 async def create_student(student: Student, current_user: Annotated[Accounts, Depends(get_current_user)]):
@@ -284,7 +367,7 @@ async def delete_student(student_id: str, current_user: Annotated[Accounts, Depe
 # Course Offerings endpoints
 @app.get("/course_offerings/", response_model=List[CourseOffering])
 async def get_course_offerings(current_user: Annotated[Accounts, Depends(get_current_user)]):
-    return list(db.course_offerings.find())
+    return list(reference_db.course_offerings.find())
 
 @app.post("/course_offerings/", response_model=CourseOffering)
 async def create_course_offering(course_offering: CourseOffering, current_user: Annotated[Accounts, Depends(get_current_user)]):
@@ -294,17 +377,54 @@ async def create_course_offering(course_offering: CourseOffering, current_user:
 @app.put("/course_offerings/{offering_id}", response_model=CourseOffering)
 async def update_course_offering(offering_id: str, course_offering: CourseOffering, current_user: Annotated[Accounts, Depends(get_current_user)]):
     db.course_offerings.update_one({"offering_id": offering_id}, {"$set": course_offering.model_dump()})
+    seat_feed.publish(offering_id)
+    seat_feed.publish(course_offering.offering_id)
     return course_offering
 
 @app.delete("/course_offerings/{offering_id}")
 async def delete_course_offering(offering_id: str, current_user: Annotated[Accounts, Depends(get_current_user)]):
     db.course_offerings.delete_one({"offering_id": offering_id})
+    seat_feed.publish(offering_id)
     return {"message": "Course Offering deleted"}
 
+@app.get("/offerings/stream")
+async def stream_offering_seats(
+    request: Request,
+    current_user: Annotated[Accounts, Depends(get_current_user)],
+    offering_id: Annotated[List[str], Query()] = [],
+    semester: Annotated[List[str], Query()] = []
+):
+    """Server-Sent Events feed of remaining seats for the given offerings or semesters.
+
+    The first event is a snapshot; later events carry only offerings that changed.
+    """
+    subscription = await seat_feed.subscribe(offering_id, semester)
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), timeout=SEAT_FEED_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield message
+        finally:
+            seat_feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Location endpoints
 @app.get("/locations/", response_model=List[Location])
 async def get_locations(current_user: Annotated[Accounts, Depends(get_current_user)]):
-    return list(db.locations.find())
+    return list(reference_db.locations.find())
 
 @app.post("/locations/", response_model=Location)
 async def create_location(location: Location, current_user: Annotated[Accounts, Depends(get_current_user)]):
@@ -324,7 +444,7 @@ async def delete_location(room_id: str, current_user: Annotated[Accounts, Depend
 # Instructors endpoints
 @app.get("/instructors/", response_model=List[Instructor])
 async def get_instructors(current_user: Annotated[Accounts, Depends(get_current_user)]):
-    return list(db.instructors.find())
+    return list(reference_db.instructors.find())
 
 @app.post("/instructors/", response_model=Instructor)
 async def create_instructor(instructor: Instructor, current_user: Annotated[Accounts, Depends(get_current_user)]):
@@ -344,7 +464,7 @@ async def delete_instructor(instructor_id: str, current_user: Annotated[Accounts
 # Programs endpoints
 @app.get("/programs/", response_model=List[Program])
 async def get_programs(current_user: Annotated[Accounts, Depends(get_current_user)]):
-    return list(db.programs.find())
+    return list(reference_db.programs.find())
 
 @app.post("/programs/", response_model=Program)
 async def create_program(program: Program, current_user: Annotated[Accounts, Depends(get_current_user)]):
@@ -364,7 +484,7 @@ async def delete_program(program_id: str, current_user: Annotated[Accounts, Depe
 # Departments endpoints
 @app.get("/departments/", response_model=List[Department])
 async def get_departments(current_user: Annotated[Accounts, Depends(get_current_user)]):
-    return list(db.departments.find())
+    return list(reference_db.departments.find())
 
 @app.post("/departments/", response_model=Department)
 async def create_department(department: Department, current_user: Annotated[Accounts, Depends(get_current_user)]):
@@ -384,7 +504,7 @@ async def delete_department(department_id: str, current_user: Annotated[Accounts
 # Faculty endpoints
 @app.get("/faculties/", response_model=List[Faculty])
 async def get_faculties(current_user: Annotated[Accounts, Depends(get_current_user)]):
-    return list(db.faculties.find())
+    return list(reference_db.faculties.find())
 
 @app.post("/faculties/", response_model=Faculty)
 async def create_faculty(faculty: Faculty, current_user: Annotated[Accounts, Depends(get_current_user)]):
@@ -404,27 +524,39 @@ async def delete_faculty(faculty_id: str, current_user: Annotated[Accounts, Depe
 # Enrollments endpoints
 @app.get("/enrollments/", response_model=List[Enrollment])
 async def get_enrollments(current_user: Annotated[Accounts, Depends(get_current_user)]):
-    return list(db.enrollments.find())
+    with causal_read(current_user) as (reads, session):
+        return list(reads.enrollments.find(session=session))
 
 @app.post("/enrollments/", response_model=Enrollment)
 async def create_enrollment(enrollment: Enrollment, current_user: Annotated[Accounts, Depends(get_current_user)]):
-    db.enrollments.insert_one(enrollment.model_dump())
+    with causal_write(current_user) as session:
+        db.enrollments.insert_one(enrollment.model_dump(), session=session)
+    seat_feed.publish(enrollment.offering_id)
     return enrollment
 
 @app.put("/enrollments/{enrollment_id}", response_model=Enrollment)
 async def update_enrollment(enrollment_id: str, enrollment: Enrollment, current_user: Annotated[Accounts, Depends(get_current_user)]):
-    db.enrollments.update_one({"enrollment_id": enrollment_id}, {"$set": enrollment.model_dump()})
+    with causal_write(current_user) as session:
+        previous = db.enrollments.find_one_and_update(
+            {"enrollment_id": enrollment_id}, {"$set": enrollment.model_dump()}, session=session
+        )
+    if previous and previous["offering_id"] != enrollment.offering_id:
+        seat_feed.publish(previous["offering_id"])
+        seat_feed.publish(enrollment.offering_id)
     return enrollment
 
 @app.delete("/enrollments/{enrollment_id}")
 async def delete_enrollment(enrollment_id: str, current_user: Annotated[Accounts, Depends(get_current_user)]):
-    db.enrollments.delete_one({"enrollment_id": enrollment_id})
+    with causal_write(current_user) as session:
+        deleted = db.enrollments.find_one_and_delete({"enrollment_id": enrollment_id}, session=session)
+    if deleted:
+        seat_feed.publish(deleted["offering_id"])
     return {"message": "Enrollment deleted"}
 
 # Prerequisites endpoints
 @app.get("/prerequisites/", response_model=List[Prerequisite])
 async def get_prerequisites(current_user: Annotated[Accounts, Depends(get_current_user)]):
-    return list(db.prerequisites.find())
+    return list(reference_db.prerequisites.find())
 
 @app.post("/prerequisites/", response_model=Prerequisite)
 async def create_prerequisite(prerequisite: Prerequisite, current_user: Annotated[Accounts, Depends(get_current_user)]):
@@ -462,7 +594,8 @@ async def create_intention(
     if existing:
         raise HTTPException(status_code=400, detail="Intention already exists")
     
-    db.course_intentions.insert_one(intention.model_dump())
+    with causal_write(current_user) as session:
+        db.course_intentions.insert_one(intention.model_dump(), session=session)
     return intention
 
 @app.get("/course_intentions/", response_model=List[CourseIntention])
@@ -480,7 +613,8 @@ async def get_all_intentions(
     if semester:
         query["semester"] = semester
     
-    return list(db.course_intentions.find(query))
+    with causal_read(current_user) as (reads, session):
+        return list(reads.course_intentions.find(query, session=session))
 
 @app.get("/course_intentions/{intention_id}", response_model=CourseIntention)
 async def get_intention(
@@ -488,7 +622,8 @@ async def get_intention(
     current_user: Annotated[Accounts, Depends(get_current_user)]
 ):
     """Get a specific intention by ID"""
-    intention = db.course_intentions.find_one({"intention_id": intention_id})
+    with causal_read(current_user) as (reads, session):
+        intention = reads.course_intentions.find_one({"intention_id": intention_id}, session=session)
     if not intention:
         raise HTTPException(status_code=404, detail="Intention not found")
     return intention
@@ -511,10 +646,12 @@ async def update_intention(
     update_data = intention_update.model_dump(exclude_unset=True)
     update_data["timestamp"] = datetime.strftime("%d/%m/%Y %H:%M:%S")
     
-    db.course_intentions.update_one(
-        {"intention_id": intention_id},
-        {"$set": update_data}
-    )
+    with causal_write(current_user) as session:
+        db.course_intentions.update_one(
+            {"intention_id": intention_id},
+            {"$set": update_data},
+            session=session
+        )
     return db.course_intentions.find_one({"intention_id": intention_id})
 
 @app.delete("/course_intentions/{intention_id}")
@@ -523,13 +660,15 @@ async def delete_intention(
     current_user: Annotated[Accounts, Depends(get_current_user)]
 ):
     """Delete a course intention"""
-    result = db.course_intentions.delete_one({"intention_id": intention_id})
+    with causal_write(current_user) as session:
+        result = db.course_intentions.delete_one({"intention_id": intention_id}, session=session)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Intention not found")
     return {"message": "Intention deleted"}
 
 @app.post("/process_intentions_simple/")
 async def process_intentions_simple(current_user: Annotated[Accounts, Depends(get_current_user)]):
+    session = client.start_session(causal_consistency=True)
     try:
         intentions = list(db.course_intentions.find({"status": "pending"}))
         if not intentions:
@@ -570,7 +709,8 @@ async def process_intentions_simple(current_user: Annotated[Accounts, Depends(ge
                           for prereq in course.get('prerequisites', [])):
                     db.course_intentions.update_one(
                         {"intention_id": intention['intention_id']},
-                        {"$set": {"status": "failed", "error": "Missing prerequisites"}}
+                        {"$set": {"status": "failed", "error": "Missing prerequisites"}},
+                        session=session
                     )
                     results['failed_prerequisites'] += 1
                     results['details'].append(f"Failed {course_code} for {student_id}: missing prerequisites")
@@ -602,10 +742,11 @@ async def process_intentions_simple(current_user: Annotated[Accounts, Depends(ge
                     "grade": "Not Finished"
                 }
                 
-                db.enrollments.insert_one(enrollment)
+                db.enrollments.insert_one(enrollment, session=session)
+                seat_feed.publish(offering_id)
                 
                 # Remove the intention
-                db.course_intentions.delete_one({"intention_id": intention['intention_id']})
+                db.course_intentions.delete_one({"intention_id": intention['intention_id']}, session=session)
                 
                 results['successful_enrollments'] += 1
                 results['details'].append(
@@ -616,7 +757,8 @@ async def process_intentions_simple(current_user: Annotated[Accounts, Depends(ge
             except HTTPException as he:
                 db.course_intentions.update_one(
                     {"intention_id": intention['intention_id']},
-                    {"$set": {"status": "failed", "error": str(he.detail)}}
+                    {"$set": {"status": "failed", "error": str(he.detail)}},
+                    session=session
                 )
                 results['failed_processing'] += 1
                 results['details'].append(f"Failed {intention['intention_id']}: {he.detail}")
@@ -625,12 +767,14 @@ async def process_intentions_simple(current_user: Annotated[Accounts, Depends(ge
             except Exception as e:
                 db.course_intentions.update_one(
                     {"intention_id": intention['intention_id']},
-                    {"$set": {"status": "failed", "error": "Unexpected error"}}
+                    {"$set": {"status": "failed", "error": "Unexpected error"}},
+                    session=session
                 )
                 results['failed_processing'] += 1
                 results['details'].append(f"Failed {intention['intention_id']}: unexpected error")
                 continue
         
+        record_write(current_user, session)
         return results
     
     except Exception as e:
@@ -638,6 +782,8 @@ async def process_intentions_simple(current_user: Annotated[Accounts, Depends(ge
             status_code=500,
             detail=f"Error processing intentions: {str(e)}"
         )
+    finally:
+        session.end_session()
 
 COLLECTIONS = {
     "accounts": "accounts",
@@ -684,6 +830,7 @@ async def reset_database():
                     if data:
                         db[collection_name].insert_many(data)
 
+        seat_feed.resync()
         return {"message": "Database reset and populated with dummy data successfully"}
     
     except Exception as e:
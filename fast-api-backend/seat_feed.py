@@ -0,0 +1,131 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+logger = logging.getLogger('uvicorn.error')
+
+SEAT_FEED_QUEUE_SIZE = 32
+
+@dataclass(eq=False)
+class SeatSubscription:
+    offering_ids: frozenset
+    semesters: frozenset
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=SEAT_FEED_QUEUE_SIZE))
+
+    def wants(self, offering_id: str, semester: Optional[str]) -> bool:
+        if not self.offering_ids and not self.semesters:
+            return True
+        return offering_id in self.offering_ids or semester in self.semesters
+
+    def matching(self, offerings: dict) -> dict:
+        return {
+            offering_id: seats for offering_id, seats in offerings.items()
+            if self.wants(offering_id, seats["semester"])
+        }
+
+class SeatFeed:
+    """Collects offerings whose seats changed and, once per tick, sends subscribers their
+    absolute remaining seats (seats_per_section minus enrollments).
+
+    Only enrollment writes made through this process are seen, which matches the
+    single-instance deployment. Queries run in a worker thread so a slow one does not
+    stall the event loop; only the fan-out happens on the loop.
+    """
+
+    def __init__(self, db, tick_seconds: float):
+        self.db = db
+        self.tick_seconds = tick_seconds
+        self.pending = set()
+        self.subscribers = set()
+        self.tick = 0
+
+    def publish(self, offering_id: str):
+        """Mark an offering's seat count or semester as changed."""
+        self.pending.add(offering_id)
+
+    def remaining_seats(self, query: dict) -> dict:
+        offerings = list(self.db.course_offerings.find(
+            query, {"offering_id": 1, "semester": 1, "seats_per_section": 1}
+        ))
+        counts = {
+            row["_id"]: row["count"] for row in self.db.enrollments.aggregate([
+                {"$match": {"offering_id": {"$in": [offering["offering_id"] for offering in offerings]}}},
+                {"$group": {"_id": "$offering_id", "count": {"$sum": 1}}}
+            ])
+        }
+        return {
+            offering["offering_id"]: {
+                "semester": offering.get("semester"),
+                "remaining": offering.get("seats_per_section", 0) - counts.get(offering["offering_id"], 0)
+            }
+            for offering in offerings
+        }
+
+    async def subscribe(self, offering_ids: List[str], semesters: List[str]) -> SeatSubscription:
+        """Register a subscriber and queue a snapshot of its offerings as the first event."""
+        subscription = SeatSubscription(frozenset(offering_ids), frozenset(semesters))
+        query = {}
+        if offering_ids or semesters:
+            query = {"$or": [{"offering_id": {"$in": offering_ids}}, {"semester": {"$in": semesters}}]}
+        offerings = await asyncio.to_thread(self.remaining_seats, query)
+        subscription.queue.put_nowait(self._encode("snapshot", offerings))
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: SeatSubscription):
+        self.subscribers.discard(subscription)
+
+    def resync(self):
+        """Tell every subscriber to refetch, e.g. after the database is reset."""
+        self.pending.clear()
+        self.tick += 1
+        message = self._encode("resync", {})
+        for subscription in list(self.subscribers):
+            self._deliver(subscription, message)
+
+    async def flush(self):
+        if not self.pending or not self.subscribers:
+            self.pending.clear()
+            return
+        changed = list(self.pending)
+        self.pending.clear()
+        offerings = await asyncio.to_thread(self.remaining_seats, {"offering_id": {"$in": changed}})
+        # Deleted offerings are reported with no seats so offering subscribers can drop them.
+        for offering_id in changed:
+            offerings.setdefault(offering_id, {"semester": None, "remaining": None})
+        self.tick += 1
+
+        # Subscribers with the same filter share one encoded message.
+        encoded = {}
+        for subscription in list(self.subscribers):
+            key = (subscription.offering_ids, subscription.semesters)
+            if key not in encoded:
+                matching = subscription.matching(offerings)
+                encoded[key] = self._encode("seats", matching) if matching else None
+            if encoded[key] is not None:
+                self._deliver(subscription, encoded[key])
+
+    def _encode(self, event: str, offerings: dict) -> str:
+        return (
+            f"id: {self.tick}\nevent: {event}\n"
+            f"data: {json.dumps({'tick': self.tick, 'offerings': offerings})}\n\n"
+        )
+
+    def _deliver(self, subscription: SeatSubscription, message: str):
+        try:
+            subscription.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A slow client gets its backlog replaced by a single resync.
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.queue.put_nowait(self._encode("resync", {}))
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(e)
@@ -0,0 +1,95 @@
+"""Read routing checks against a local three-member replica set.
+
+Set MONGODB_URI to the replica set (see README) to run these; they are skipped otherwise.
+"""
+import asyncio
+import os
+import time
+from uuid import uuid4
+
+import pytest
+
+if not os.getenv("MONGODB_URI"):
+    pytest.skip("MONGODB_URI is not set to a local replica set", allow_module_level=True)
+
+from pymongo import monitoring  # noqa: E402
+
+
+class CommandRecorder(monitoring.CommandListener):
+    def __init__(self):
+        self.events = []
+
+    def started(self, event):
+        self.events.append(event)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# Must be registered before main creates its client
+recorder = CommandRecorder()
+monitoring.register(recorder)
+
+import main  # noqa: E402
+
+WRITER = {"username": f"routing-writer-{uuid4().hex}"}
+READER = {"username": f"routing-reader-{uuid4().hex}"}
+
+
+def commands(name, collection):
+    return [event for event in recorder.events
+            if event.command_name == name and event.command.get(name) == collection]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def replica_set_discovered():
+    deadline = time.monotonic() + 30
+    while len(main.client.secondaries) < 2:
+        if time.monotonic() > deadline:
+            pytest.fail("Replica set secondaries were not discovered")
+        time.sleep(0.5)
+
+
+@pytest.fixture(autouse=True)
+def clear_events():
+    recorder.events.clear()
+
+
+def test_reference_reads_use_a_secondary():
+    asyncio.run(main.get_courses(READER))
+    assert commands("find", "courses")[-1].connection_id in main.client.secondaries
+
+
+def test_report_reads_use_a_secondary_without_a_recent_write():
+    asyncio.run(main.get_enrollments(READER))
+    read = commands("find", "enrollments")[-1]
+    assert read.connection_id in main.client.secondaries
+    assert read.command["readConcern"] == {"level": "majority"}
+
+
+def test_auth_reads_use_the_primary():
+    main.authenticate_user(READER["username"], "password")
+    assert commands("find", "accounts")[-1].connection_id == main.client.primary
+
+
+def test_enrollment_is_read_from_the_primary_by_its_writer():
+    enrollment = main.Enrollment(
+        enrollment_id=f"routing-{uuid4().hex}",
+        student_id="routing-student",
+        offering_id="routing-offering",
+        enrollment_date="2026-01-01"
+    )
+    try:
+        asyncio.run(main.create_enrollment(enrollment, WRITER))
+        assert commands("insert", "enrollments")[-1].connection_id == main.client.primary
+
+        enrollments = asyncio.run(main.get_enrollments(WRITER))
+        read = commands("find", "enrollments")[-1]
+        assert read.connection_id == main.client.primary
+        assert read.command["readConcern"]["afterClusterTime"] == main.last_writes[WRITER["username"]][1]
+        assert enrollment.enrollment_id in [document["enrollment_id"] for document in enrollments]
+    finally:
+        main.db.enrollments.delete_one({"enrollment_id": enrollment.enrollment_id})
@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+import pytest
+
+import seat_feed
+from seat_feed import SeatFeed
+
+
+class StubCollection:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, query, projection=None):
+        return [document for document in self.documents if matches(document, query)]
+
+    def aggregate(self, pipeline):
+        offering_ids = pipeline[0]["$match"]["offering_id"]["$in"]
+        counts = {}
+        for document in self.documents:
+            if document["offering_id"] in offering_ids:
+                counts[document["offering_id"]] = counts.get(document["offering_id"], 0) + 1
+        return [{"_id": offering_id, "count": count} for offering_id, count in counts.items()]
+
+
+class StubDB:
+    def __init__(self):
+        self.course_offerings = StubCollection([
+            {"offering_id": "O1", "semester": "Fall", "seats_per_section": 30},
+            {"offering_id": "O2", "semester": "Winter", "seats_per_section": 20},
+            {"offering_id": "O3", "semester": "Fall", "seats_per_section": 10},
+        ])
+        self.enrollments = StubCollection([
+            {"enrollment_id": "E1", "offering_id": "O1"},
+            {"enrollment_id": "E2", "offering_id": "O2"},
+        ])
+
+
+def matches(document, query):
+    if "$or" in query:
+        return any(matches(document, clause) for clause in query["$or"])
+    return all(document.get(key) in condition["$in"] for key, condition in query.items())
+
+
+def subscribe(feed, offering_ids, semesters):
+    return asyncio.run(feed.subscribe(offering_ids, semesters))
+
+
+def read_event(subscription):
+    lines = subscription.queue.get_nowait().strip().split("\n")
+    fields = dict(line.split(": ", 1) for line in lines)
+    return fields["event"], json.loads(fields["data"])
+
+
+@pytest.fixture
+def feed():
+    return SeatFeed(StubDB(), tick_seconds=1)
+
+
+def test_subscribe_sends_snapshot(feed):
+    subscription = subscribe(feed, ["O2"], ["Fall"])
+    event, data = read_event(subscription)
+    assert event == "snapshot"
+    assert data["offerings"] == {
+        "O1": {"semester": "Fall", "remaining": 29},
+        "O2": {"semester": "Winter", "remaining": 19},
+        "O3": {"semester": "Fall", "remaining": 10},
+    }
+
+
+def test_flush_coalesces_changes_within_a_tick(feed):
+    subscription = subscribe(feed, [], [])
+    read_event(subscription)
+    feed.db.enrollments.documents += [
+        {"enrollment_id": "E3", "offering_id": "O1"},
+        {"enrollment_id": "E4", "offering_id": "O1"},
+    ]
+    feed.publish("O1")
+    feed.publish("O1")
+    asyncio.run(feed.flush())
+
+    event, data = read_event(subscription)
+    assert event == "seats"
+    assert data["offerings"] == {"O1": {"semester": "Fall", "remaining": 27}}
+    assert subscription.queue.empty()
+
+
+def test_flush_only_sends_matching_offerings(feed):
+    by_offering = subscribe(feed, ["O1"], [])
+    by_semester = subscribe(feed, [], ["Winter"])
+    read_event(by_offering)
+    read_event(by_semester)
+    feed.publish("O1")
+    feed.publish("O2")
+    asyncio.run(feed.flush())
+
+    assert set(read_event(by_offering)[1]["offerings"]) == {"O1"}
+    assert set(read_event(by_semester)[1]["offerings"]) == {"O2"}
+
+
+def test_flush_skips_subscribers_without_matches(feed):
+    subscription = subscribe(feed, ["O3"], [])
+    read_event(subscription)
+    feed.publish("O1")
+    asyncio.run(feed.flush())
+    assert subscription.queue.empty()
+
+
+def test_flush_reports_deleted_offerings(feed):
+    subscription = subscribe(feed, ["O9"], [])
+    read_event(subscription)
+    feed.publish("O9")
+    asyncio.run(feed.flush())
+    assert read_event(subscription)[1]["offerings"] == {"O9": {"semester": None, "remaining": None}}
+
+
+def test_identical_filters_share_one_encoded_message(feed):
+    first = subscribe(feed, ["O1"], [])
+    second = subscribe(feed, ["O1"], [])
+    read_event(first)
+    read_event(second)
+    feed.publish("O1")
+    asyncio.run(feed.flush())
+    assert first.queue.get_nowait() is second.queue.get_nowait()
+
+
+def test_full_queue_is_replaced_by_resync(feed):
+    subscription = subscribe(feed, ["O1"], [])
+    for _ in range(seat_feed.SEAT_FEED_QUEUE_SIZE):
+        feed.publish("O1")
+        asyncio.run(feed.flush())
+
+    assert subscription.queue.qsize() == 1
+    assert read_event(subscription)[0] == "resync"
+
+
+def test_resync_clears_pending_changes(feed):
+    subscription = subscribe(feed, [], [])
+    read_event(subscription)
+    feed.publish("O1")
+    feed.resync()
+    asyncio.run(feed.flush())
+
+    assert read_event(subscription)[0] == "resync"
+    assert subscription.queue.empty()
@@ -337,6 +337,122 @@ export async function getCourseOfferings() {
   return await response.json();
 }
 
+// Reconnect delays for the seat feed, doubled after each failed attempt. The actual wait
+// is randomised so clients dropped together do not all reconnect at once.
+const SEAT_FEED_MIN_RETRY_MS = 1000;
+const SEAT_FEED_MAX_RETRY_MS = 30000;
+const SEAT_FEED_RESYNC_SPREAD_MS = 5000;
+
+/**
+ * Subscribe to live remaining-seat counts for course offerings.
+ * Uses fetch rather than EventSource so the Authorization header can be sent.
+ * Reconnects with jittered backoff until closed; each connection starts with a snapshot,
+ * so callers do not need to refetch course offerings after a reconnect.
+ * @param {{offeringIds?: string[], semesters?: string[]}} filters - Offerings or semesters to watch (all when empty)
+ * @param {(offerings: Record<string, {semester: string | null, remaining: number | null}>) => void} onSeats - Called with the snapshot and each batch of changed offerings
+ * @returns {() => void} - Function that closes the stream
+ */
+export function subscribeSeatUpdates(filters, onSeats) {
+  const controller = new AbortController();
+  const params = new URLSearchParams();
+  (filters.offeringIds || []).forEach((id) => params.append("offering_id", id));
+  (filters.semesters || []).forEach((semester) => params.append("semester", semester));
+  let retryDelay = SEAT_FEED_MIN_RETRY_MS;
+
+  /**
+   * Read one stream until it ends or the server asks for a resync
+   * @returns {Promise<boolean>} - Whether the server asked for a resync
+   */
+  async function listen() {
+    const authToken = get(token);
+
+    const response = await fetch(`${ENDPOINTS.OFFERINGS_STREAM}?${params}`, {
+      headers: {
+        Accept: "text/event-stream",
+        Authorization: authToken ? `Bearer ${authToken}` : "",
+      },
+      signal: controller.signal,
+    });
+
+    if (!response.ok || !response.body) {
+      if (response.status === 401) {
+        // Clear user and token
+        user.set(null);
+        token.set(null);
+
+        // Stop reconnecting and redirect to login
+        controller.abort();
+        goto("/login");
+      }
+      throw new Error(`API error: ${response.status}`);
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = "";
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) return false;
+      buffer += value;
+
+      // Events are separated by a blank line
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const lines = buffer.slice(0, boundary).split("\n");
+        buffer = buffer.slice(boundary + 2);
+
+        const event = lines.find((line) => line.startsWith("event: "))?.slice(7);
+        const data = lines.find((line) => line.startsWith("data: "))?.slice(6);
+        if ((event === "snapshot" || event === "seats") && data) {
+          retryDelay = SEAT_FEED_MIN_RETRY_MS;
+          onSeats(JSON.parse(data).offerings);
+        } else if (event === "resync") {
+          reader.cancel();
+          return true;
+        }
+      }
+    }
+  }
+
+  /**
+   * Wait before reconnecting, returning early if the stream is closed
+   * @param {number} ms - Delay in milliseconds
+   * @returns {Promise<void>}
+   */
+  function wait(ms) {
+    return new Promise((resolve) => {
+      const timer = setTimeout(resolve, ms);
+      controller.signal.addEventListener("abort", () => {
+        clearTimeout(timer);
+        resolve();
+      }, { once: true });
+    });
+  }
+
+  async function run() {
+    while (!controller.signal.aborted) {
+      let resync = false;
+      try {
+        resync = await listen();
+      } catch (error) {
+        if (controller.signal.aborted) break;
+        console.error("Seat feed error:", error);
+      }
+
+      // A server resync reconnects within a short random spread; a dropped stream backs off
+      if (resync) {
+        await wait(Math.random() * SEAT_FEED_RESYNC_SPREAD_MS);
+      } else {
+        await wait(retryDelay / 2 + Math.random() * retryDelay / 2);
+        retryDelay = Math.min(retryDelay * 2, SEAT_FEED_MAX_RETRY_MS);
+      }
+    }
+  }
+
+  run();
+
+  return () => controller.abort();
+}
+
 /**
  * Get all course intentions
  * @returns {Promise<any[]>} - Array of course intentions
@@ -10,6 +10,7 @@ export const ENDPOINTS = {
   COURSES: `${API_URL}/courses/`,
   ENROLLMENTS: `${API_URL}/enrollments/`,
   COURSE_OFFERINGS: `${API_URL}/course_offerings/`,
+  OFFERINGS_STREAM: `${API_URL}/offerings/stream`,
   STUDENTS: `${API_URL}/students/`,
   DEPARTMENTS: `${API_URL}/departments/`,
   FACULTIES: `${API_URL}/faculties/`,